@@ -1,6 +1,9 @@
 import os
 from functools import lru_cache
-from pydantic import BaseSettings
+try:
+    from pydantic_settings import BaseSettings
+except ImportError:  # pydantic v1
+    from pydantic import BaseSettings
 
 class Settings(BaseSettings):
     # API Configuration
@@ -10,10 +13,24 @@ class Settings(BaseSettings):
     host: str = "0.0.0.0"
     port: int = 8000
     debug: bool = False
+    workers: int = 1  # 0 uses one worker per available CPU
+    forwarded_allow_ips: str = "127.0.0.1"  # Proxies trusted to set X-Forwarded-For
     
     # File Upload Configuration
     max_file_size: int = 10 * 1024 * 1024  # 10MB
     allowed_extensions: list = [".jpg", ".jpeg", ".png", ".gif", ".bmp", ".tiff"]
+    upload_sniff_size: int = 64 * 1024  # Leading bytes inspected for format and dimensions
+    upload_spool_threshold: int = 1024 * 1024  # Spill to disk above 1MB
+    max_image_pixels: int = 40_000_000  # Reject oversized dimensions early
+    
+    # Shared Store Configuration (memory, sqlite or redis)
+    store_backend: str = "sqlite"
+    store_url: str = ""  # SQLite path or Redis URL; empty uses the backend default
+    cache_ttl: int = 7 * 24 * 60 * 60  # Parsed schedules kept for a week
+    
+    # Rate Limiting (per client IP, shared across workers)
+    rate_limit_requests: int = 0  # 0 disables rate limiting
+    rate_limit_window: int = 60  # seconds
     
     # Application Configuration
     app_name: str = "Prayer Times Parser"
@@ -23,6 +40,15 @@ class Settings(BaseSettings):
         env_file = ".env"
         case_sensitive = False
 
+    @property
+    def worker_count(self) -> int:
+        if self.workers > 0:
+            return self.workers
+        # Respect container CPU affinity instead of counting every host core
+        if hasattr(os, "sched_getaffinity"):
+            return len(os.sched_getaffinity(0)) or 1
+        return os.cpu_count() or 1
+
 @lru_cache()
 def get_settings():
     return Settings()
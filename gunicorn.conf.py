@@ -0,0 +1,21 @@
+# Gunicorn configuration for multi-worker deployments
+import os
+import sys
+
+# Gunicorn adds the working directory to sys.path only after loading this file
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import settings
+
+bind = f"{settings.host}:{settings.port}"
+workers = settings.worker_count
+worker_class = "uvicorn_worker.UvicornWorker"
+
+# Client IPs for rate limiting come from X-Forwarded-For only when sent by these proxies
+forwarded_allow_ips = settings.forwarded_allow_ips
+
+# Import the app once in the master so workers fork with modules already loaded
+preload_app = True
+
+accesslog = "-"
+loglevel = "info"
@@ -1,9 +1,11 @@
 import os
+import time
+
 import uvicorn
 from dotenv import load_dotenv
 
-from fastapi import FastAPI, File, UploadFile, HTTPException, Request
-from fastapi.responses import HTMLResponse, Response
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import HTMLResponse, JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 
@@ -11,6 +13,9 @@ from parser import PrayerTimesParser
 from calendar_generator import CalendarGenerator
 from models import MonthlyPrayerSchedule
 from sanity_checker import PrayerTimesSanityChecker
+from upload_handler import UploadHandler
+from store import create_store
+from config import settings
 
 # Load environment variables
 load_dotenv()
@@ -26,6 +31,25 @@ app = FastAPI(
 parser = PrayerTimesParser()
 calendar_generator = CalendarGenerator()
 sanity_checker = PrayerTimesSanityChecker()
+upload_handler = UploadHandler(settings)
+
+# Parse results and rate-limit buckets shared by all workers
+store = create_store(settings)
+
+async def cache_get(key: str):
+    """Read from the shared store, treating backend failures as a cache miss."""
+    try:
+        return await store.get(key)
+    except Exception as e:
+        print(f"Warning: store read failed for {key}: {e}")
+        return None
+
+async def cache_set(key: str, value: bytes):
+    """Write to the shared store, ignoring backend failures."""
+    try:
+        await store.set(key, value, settings.cache_ttl)
+    except Exception as e:
+        print(f"Warning: store write failed for {key}: {e}")
 
 # Setup templates
 templates = Jinja2Templates(directory="templates")
@@ -34,29 +58,74 @@ templates = Jinja2Templates(directory="templates")
 os.makedirs("static", exist_ok=True)
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
+@app.middleware("http")
+async def rate_limit_uploads(request: Request, call_next):
+    """Limit uploads per client IP with a fixed-window counter in the shared store."""
+    if request.url.path == "/upload" and settings.rate_limit_requests > 0:
+        client = request.client.host if request.client else "unknown"
+        window = int(time.time() // settings.rate_limit_window)
+        try:
+            count = await store.incr(f"ratelimit:{client}:{window}", settings.rate_limit_window)
+        except Exception as e:
+            # Rate limiting fails open so a store outage does not block uploads
+            print(f"Warning: rate limit check failed: {e}")
+            count = 0
+        if count > settings.rate_limit_requests:
+            return JSONResponse(
+                status_code=429,
+                content={"detail": "Too many uploads. Please try again later."},
+                headers={"Retry-After": str(settings.rate_limit_window)}
+            )
+    return await call_next(request)
+
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
     """Home page with upload form."""
     return templates.TemplateResponse("index.html", {"request": request})
 
-@app.post("/upload")
-async def upload_prayer_timetable(file: UploadFile = File(...)):
+# The body is parsed by UploadHandler as it streams in, so the form is declared here for the docs only
+UPLOAD_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                    "required": ["file"]
+                }
+            }
+        }
+    }
+}
+
+@app.post("/upload", openapi_extra=UPLOAD_REQUEST_BODY)
+async def upload_prayer_timetable(request: Request):
     """Upload and parse prayer timetable image."""
-    # Validate file type
-    if not file.content_type or not file.content_type.startswith('image/'):
-        raise HTTPException(status_code=400, detail="Please upload an image file")
-    
     try:
-        # Read file contents
-        contents = await file.read()
-        
-        # Parse prayer timetable
-        prayer_schedule = await parser.parse_prayer_timetable(contents)
+        # Stream file contents, enforcing size and format limits
+        with await upload_handler.receive(request) as upload:
+            cache_key = f"parse:{upload.digest}"
+            prayer_schedule = None
+            cached = await cache_get(cache_key)
+            if cached is not None:
+                try:
+                    prayer_schedule = MonthlyPrayerSchedule.model_validate_json(cached)
+                except ValueError as e:
+                    print(f"Warning: ignoring invalid cached schedule for {cache_key}: {e}")
+            from_cache = prayer_schedule is not None
+            if not from_cache:
+                # Parse prayer timetable
+                prayer_schedule = await parser.parse_prayer_timetable(upload.read())
         
         # Perform sanity checks
         sanity_results = sanity_checker.check_schedule(prayer_schedule)
         sanity_report = sanity_checker.generate_report(sanity_results)
         
+        # Only cache parses that pass the sanity checks, so a bad OCR result can be retried
+        if not from_cache and sanity_results["is_valid"]:
+            await cache_set(cache_key, prayer_schedule.model_dump_json().encode())
+        
         # Return the parsed data, sanity check results, and download link
         return {
             "message": "Prayer timetable parsed successfully",
@@ -123,4 +192,11 @@ if __name__ == "__main__":
     if not os.getenv("MISTRAL_API_KEY"):
         print("Warning: MISTRAL_API_KEY environment variable not set")
     
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # Multiple workers require an import string so each process loads the app
+    uvicorn.run(
+        "main:app",
+        host=settings.host,
+        port=settings.port,
+        workers=settings.worker_count,
+        forwarded_allow_ips=settings.forwarded_allow_ips
+    )
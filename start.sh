@@ -28,9 +28,5 @@ export PYTHONUNBUFFERED=1
 
 # Start the application with production settings
 echo "🌐 Starting server on http://0.0.0.0:${PORT:-8000}"
-uvicorn main:app \
-    --host 0.0.0.0 \
-    --port ${PORT:-8000} \
-    --workers ${WORKERS:-1} \
-    --access-log \
-    --log-level info
+# Worker count, bind address and shared store come from config.py / .env
+exec gunicorn main:app -c gunicorn.conf.py
@@ -0,0 +1,183 @@
+import os
+import time
+import sqlite3
+import threading
+from typing import Dict, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from config import Settings, settings as default_settings
+
+
+class InMemoryStore:
+    """Process-local store; a stand-in for the shared backends in single-worker setups and tests.
+
+    All stores expose the same async get/set/incr interface.
+    """
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[bytes, Optional[float]]] = {}
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._data[key]
+                return None
+            return value
+
+    async def set(self, key: str, value: bytes, ttl: Optional[int] = None):
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+
+    async def incr(self, key: str, ttl: int) -> int:
+        """Increment a counter, starting a new one with the given TTL if absent or expired."""
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or (entry[1] is not None and entry[1] <= now):
+                count, expires_at = 1, now + ttl
+            else:
+                count, expires_at = int(entry[0]) + 1, entry[1]
+            self._data[key] = (str(count).encode(), expires_at)
+            return count
+
+
+class SQLiteStore:
+    """Store backed by a SQLite file, shared by all worker processes on one host.
+
+    Queries may wait on the database lock, so they run in the threadpool to
+    keep the event loop free.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        # Connections must not cross a fork, so each worker opens its own
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS store ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS store_expires_at ON store (expires_at)")
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def _get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT value FROM store WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def _set(self, key: str, value: bytes, ttl: Optional[int] = None):
+        now = time.time()
+        expires_at = now + ttl if ttl else None
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM store WHERE expires_at <= ?", (now,))
+            conn.execute(
+                "INSERT OR REPLACE INTO store (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, expires_at)
+            )
+
+    def _incr(self, key: str, ttl: int) -> int:
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT value FROM store WHERE key = ? AND expires_at > ?", (key, now)
+                ).fetchone()
+                if row:
+                    count = int(row[0]) + 1
+                    conn.execute("UPDATE store SET value = ? WHERE key = ?", (str(count).encode(), key))
+                else:
+                    count = 1
+                    conn.execute(
+                        "INSERT OR REPLACE INTO store (key, value, expires_at) VALUES (?, ?, ?)",
+                        (key, str(count).encode(), now + ttl)
+                    )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return count
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await run_in_threadpool(self._get, key)
+
+    async def set(self, key: str, value: bytes, ttl: Optional[int] = None):
+        await run_in_threadpool(self._set, key, value, ttl)
+
+    async def incr(self, key: str, ttl: int) -> int:
+        """Increment a counter, starting a new one with the given TTL if absent or expired."""
+        return await run_in_threadpool(self._incr, key, ttl)
+
+
+class RedisStore:
+    """Store backed by a Redis-compatible server, shared across hosts."""
+
+    def __init__(self, url: str):
+        try:
+            import redis.asyncio as aioredis
+        except ImportError:
+            raise RuntimeError("STORE_BACKEND=redis requires the 'redis' package: pip install redis")
+        self._aioredis = aioredis
+        self.url = url
+        self._client = None
+        self._pid: Optional[int] = None
+
+    def _connection(self):
+        # Async connections are bound to the worker's event loop, so each worker opens its own
+        if self._client is None or self._pid != os.getpid():
+            self._client = self._aioredis.Redis.from_url(self.url)
+            self._pid = os.getpid()
+        return self._client
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._connection().get(key)
+
+    async def set(self, key: str, value: bytes, ttl: Optional[int] = None):
+        await self._connection().set(key, value, ex=ttl or None)
+
+    async def incr(self, key: str, ttl: int) -> int:
+        """Increment a counter, starting a new one with the given TTL if absent or expired."""
+        pipe = self._connection().pipeline()
+        pipe.set(key, 0, ex=ttl, nx=True)
+        pipe.incr(key)
+        _, count = await pipe.execute()
+        return count
+
+
+def create_store(settings: Settings = default_settings):
+    """Build the store selected by STORE_BACKEND."""
+    backend = settings.store_backend.lower()
+    if backend == "memory":
+        return InMemoryStore()
+    if backend == "sqlite":
+        path = settings.store_url
+        if not path:
+            # Keep the default out of world-writable temp directories
+            data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+            os.makedirs(data_dir, mode=0o700, exist_ok=True)
+            path = os.path.join(data_dir, "prayercal.sqlite3")
+        return SQLiteStore(path)
+    if backend == "redis":
+        return RedisStore(settings.store_url or "redis://localhost:6379/0")
+    raise ValueError(f"Unknown STORE_BACKEND '{settings.store_backend}'. Use memory, sqlite or redis")
@@ -57,6 +57,32 @@ test_import_modules() {
     return 0
 }
 
+test_store() {
+    echo "🗄️ Testing shared store backends..."
+    cd /home/mustafah/prayercal
+    
+    if /home/mustafah/prayercal/.venv/bin/python test_store.py >/dev/null 2>&1; then
+        echo -e "${GREEN}✅ Store backends passed${NC}"
+        return 0
+    else
+        echo -e "${RED}❌ Store backend checks failed${NC}"
+        return 1
+    fi
+}
+
+test_upload_handler() {
+    echo "📤 Testing streaming upload intake..."
+    cd /home/mustafah/prayercal
+    
+    if /home/mustafah/prayercal/.venv/bin/python test_upload_handler.py >/dev/null 2>&1; then
+        echo -e "${GREEN}✅ Upload intake passed${NC}"
+        return 0
+    else
+        echo -e "${RED}❌ Upload intake checks failed${NC}"
+        return 1
+    fi
+}
+
 check_dependencies() {
     echo "📋 Checking dependencies..."
     cd /home/mustafah/prayercal
@@ -102,6 +128,16 @@ if ! test_import_modules; then
     ((failed_tests++))
 fi
 
+# Test shared store backends
+if ! test_store; then
+    ((failed_tests++))
+fi
+
+# Test streaming upload intake
+if ! test_upload_handler; then
+    ((failed_tests++))
+fi
+
 # Test if server is running
 echo "⏳ Waiting for server to be ready..."
 sleep 2
@@ -0,0 +1,55 @@
+"""Checks for the shared store backends. Run with `python test_store.py`."""
+import os
+import time
+import asyncio
+import tempfile
+from multiprocessing import Pool
+
+from store import InMemoryStore, SQLiteStore
+
+
+def _check_store(store):
+    async def run():
+        assert await store.get("missing") is None
+
+        await store.set("key", b"value", ttl=60)
+        assert await store.get("key") == b"value"
+
+        await store.set("short", b"value", ttl=1)
+        assert await store.incr("counter", ttl=1) == 1
+        assert await store.incr("counter", ttl=1) == 2
+
+        time.sleep(1.1)
+        assert await store.get("short") is None
+        assert await store.incr("counter", ttl=1) == 1
+
+    asyncio.run(run())
+
+
+def test_in_memory_store():
+    _check_store(InMemoryStore())
+
+
+def test_sqlite_store():
+    with tempfile.TemporaryDirectory() as tmp:
+        _check_store(SQLiteStore(os.path.join(tmp, "store.sqlite3")))
+
+
+def _increment_many(path):
+    store = SQLiteStore(path)
+    return [store._incr("shared", 60) for _ in range(100)]
+
+
+def test_sqlite_store_shared_between_processes():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "store.sqlite3")
+        with Pool(4) as pool:
+            counts = sum(pool.map(_increment_many, [path] * 4), [])
+        assert sorted(counts) == list(range(1, 401))
+
+
+if __name__ == "__main__":
+    for name, check in list(globals().items()):
+        if name.startswith("test_"):
+            check()
+            print(f"✅ {name}")
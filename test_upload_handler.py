@@ -0,0 +1,146 @@
+"""Checks for streaming upload intake. Run with `python test_upload_handler.py`."""
+import io
+import hashlib
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from config import Settings
+from upload_handler import UploadHandler
+
+MAX_FILE_SIZE = 200 * 1024
+
+handler = UploadHandler(Settings(
+    max_file_size=MAX_FILE_SIZE,
+    upload_sniff_size=1024,
+    upload_spool_threshold=4096,
+    max_image_pixels=1_000_000,
+))
+
+app = FastAPI()
+
+
+@app.post("/upload")
+async def upload(request: Request):
+    with await handler.receive(request) as received:
+        contents = received.read()
+        return {
+            "size": received.size,
+            "digest": received.digest,
+            "format": received.image_format,
+            "width": received.width,
+            "height": received.height,
+            "contents_digest": hashlib.sha256(contents).hexdigest(),
+        }
+
+
+client = TestClient(app)
+
+
+def _image(image_format, size=(200, 100), **params):
+    buffer = io.BytesIO()
+    Image.new("RGB", size).save(buffer, image_format, **params)
+    return buffer.getvalue()
+
+
+def _post(filename, data, content_type="image/png"):
+    return client.post("/upload", files={"file": (filename, data, content_type)})
+
+
+def test_valid_png():
+    data = _image("PNG")
+    response = _post("table.png", data)
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["size"] == len(data)
+    assert body["digest"] == hashlib.sha256(data).hexdigest() == body["contents_digest"]
+    assert (body["format"], body["width"], body["height"]) == ("png", 200, 100)
+
+
+def test_valid_jpeg():
+    data = _image("JPEG")
+    response = _post("table.jpg", data, "image/jpeg")
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["size"] == len(data)
+    assert body["digest"] == hashlib.sha256(data).hexdigest()
+    assert (body["format"], body["width"], body["height"]) == ("jpeg", 200, 100)
+
+
+def test_jpeg_header_past_sniffed_bytes():
+    # A large ICC profile pushes the SOF marker beyond upload_sniff_size
+    data = _image("JPEG", icc_profile=b"\0" * 4096)
+    response = _post("table.jpg", data, "image/jpeg")
+    assert response.status_code == 200, response.text
+    assert (response.json()["width"], response.json()["height"]) == (200, 100)
+
+    data = _image("JPEG", size=(1200, 1000), icc_profile=b"\0" * 4096)
+    assert _post("table.jpg", data, "image/jpeg").status_code == 413
+
+
+def test_tiff_dimensions():
+    response = _post("table.tiff", _image("TIFF"), "image/tiff")
+    assert response.status_code == 200, response.text
+    assert (response.json()["width"], response.json()["height"]) == (200, 100)
+
+    assert _post("table.tiff", _image("TIFF", size=(1200, 1000)), "image/tiff").status_code == 413
+
+
+def test_chunked_upload_over_limit():
+    # A generator body is sent chunked, without a Content-Length header
+    def body():
+        yield (b'--bnd\r\nContent-Disposition: form-data; name="file"; filename="a.png"\r\n'
+               b"Content-Type: image/png\r\n\r\n" + _image("PNG"))
+        for _ in range(100):
+            yield b"\0" * (64 * 1024)
+        yield b"\r\n--bnd--\r\n"
+
+    response = client.post(
+        "/upload", content=body(), headers={"content-type": "multipart/form-data; boundary=bnd"}
+    )
+    assert response.status_code == 413
+    assert response.json()["detail"] == "File too large. Maximum size is 200KB"
+
+
+def test_bad_magic_bytes():
+    response = _post("table.png", b"not an image" * 10)
+    assert response.status_code == 400
+    assert "not a supported image format" in response.json()["detail"]
+
+
+def test_disallowed_extension():
+    response = _post("table.exe", _image("PNG"))
+    assert response.status_code == 400
+    assert "Unsupported file type" in response.json()["detail"]
+
+
+def test_dimensions_over_limit():
+    response = _post("table.png", _image("PNG", size=(2000, 1000)))
+    assert response.status_code == 413
+    assert "2000x1000" in response.json()["detail"]
+
+
+def test_empty_file():
+    response = _post("table.png", b"")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Uploaded file is empty"
+
+
+def test_missing_file_field():
+    response = client.post("/upload", files={"other": ("table.png", _image("PNG"), "image/png")})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Missing 'file' upload"
+
+
+def test_non_multipart_body():
+    response = client.post("/upload", json={"file": "table.png"})
+    assert response.status_code == 400
+    assert "multipart/form-data" in response.json()["detail"]
+
+
+if __name__ == "__main__":
+    for name, check in list(globals().items()):
+        if name.startswith("test_"):
+            check()
+            print(f"✅ {name}")
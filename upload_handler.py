@@ -0,0 +1,295 @@
+import os
+import hashlib
+import tempfile
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, Request
+from PIL import Image
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
+
+from config import Settings, settings as default_settings
+
+# Slack allowed on top of max_file_size for multipart boundaries and headers
+MULTIPART_OVERHEAD = 16 * 1024
+
+# Leading bytes identifying each supported image format
+MAGIC_NUMBERS = [
+    (b"\xff\xd8\xff", "jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+    (b"BM", "bmp"),
+    (b"II*\x00", "tiff"),
+    (b"MM\x00*", "tiff"),
+]
+
+FORMAT_EXTENSIONS = {
+    "jpeg": (".jpg", ".jpeg"),
+    "png": (".png",),
+    "gif": (".gif",),
+    "bmp": (".bmp",),
+    "tiff": (".tiff", ".tif"),
+}
+
+# JPEG start-of-frame markers carrying the image dimensions
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+class ImageUpload:
+    """A fully received upload, held in memory or spilled to a temp file."""
+
+    def __init__(self, spool, size: int, digest: str, image_format: str,
+                 width: Optional[int], height: Optional[int]):
+        self._spool = spool
+        self.size = size
+        self.digest = digest
+        self.image_format = image_format
+        self.width = width
+        self.height = height
+
+    def read(self) -> bytes:
+        """Return the complete upload contents."""
+        self._spool.seek(0)
+        return self._spool.read()
+
+    def close(self):
+        self._spool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class _FilePart:
+    """State for the multipart part currently being parsed."""
+
+    def __init__(self):
+        self.headers = {}
+        self.header_field = b""
+        self.header_value = b""
+        self.is_file = False
+
+
+class UploadHandler:
+    """Streams multipart uploads off the wire, validating and hashing them on the way in."""
+
+    def __init__(self, settings: Settings = default_settings):
+        self.max_file_size = settings.max_file_size
+        self.allowed_extensions = {ext.lower() for ext in settings.allowed_extensions}
+        self.sniff_size = settings.upload_sniff_size
+        self.spool_threshold = settings.upload_spool_threshold
+        self.max_image_pixels = settings.max_image_pixels
+
+    def exceeds_limit(self, content_length: Optional[str]) -> bool:
+        """Check a request Content-Length header against the upload size cap."""
+        if not content_length or not content_length.isdigit():
+            return False
+        return int(content_length) > self.max_file_size + MULTIPART_OVERHEAD
+
+    async def receive(self, request: Request, field_name: str = "file") -> ImageUpload:
+        """Parse the request body as it arrives, rejecting bad input as early as possible.
+
+        The size cap, magic bytes and image dimensions are all checked inside the
+        read loop, so oversized or invalid uploads are refused before the rest of
+        the body is transferred. Requests without a Content-Length are capped by
+        counting body bytes.
+        """
+        if self.exceeds_limit(request.headers.get("content-length")):
+            raise self._too_large()
+
+        content_type, params = parse_options_header(request.headers.get("content-type", ""))
+        boundary = params.get(b"boundary")
+        if content_type != b"multipart/form-data" or not boundary:
+            raise HTTPException(status_code=400, detail="Please upload an image file as multipart/form-data")
+
+        spool = tempfile.SpooledTemporaryFile(max_size=self.spool_threshold)
+        sha256 = hashlib.sha256()
+        state = {"part": None, "found": False, "size": 0, "head": b"",
+                 "format": None, "width": None, "height": None}
+
+        def on_part_begin():
+            state["part"] = _FilePart()
+
+        def on_header_field(data: bytes, start: int, end: int):
+            state["part"].header_field += data[start:end]
+
+        def on_header_value(data: bytes, start: int, end: int):
+            state["part"].header_value += data[start:end]
+
+        def on_header_end():
+            part = state["part"]
+            part.headers[part.header_field.lower()] = part.header_value
+            part.header_field = b""
+            part.header_value = b""
+
+        def on_headers_finished():
+            part = state["part"]
+            _, disposition = parse_options_header(part.headers.get(b"content-disposition", b""))
+            if disposition.get(b"name", b"").decode("latin-1") != field_name or state["found"]:
+                return
+            if not part.headers.get(b"content-type", b"").startswith(b"image/"):
+                raise HTTPException(status_code=400, detail="Please upload an image file")
+            filename = disposition.get(b"filename")
+            self._check_extension(filename.decode("utf-8", "replace") if filename else None)
+            part.is_file = True
+            state["found"] = True
+
+        def on_part_data(data: bytes, start: int, end: int):
+            if not state["part"].is_file:
+                return
+            chunk = data[start:end]
+            state["size"] += len(chunk)
+            if state["size"] > self.max_file_size:
+                raise self._too_large()
+
+            if state["format"] is None:
+                state["head"] += chunk
+                if len(state["head"]) >= self.sniff_size:
+                    sniff()
+
+            sha256.update(chunk)
+            spool.write(chunk)
+
+        def on_part_end():
+            if state["part"].is_file and state["format"] is None and state["head"]:
+                sniff()
+
+        def sniff():
+            head = state["head"]
+            state["format"] = self._sniff_format(head)
+            state["width"], state["height"] = self._sniff_dimensions(state["format"], head)
+            self._check_dimensions(state["width"], state["height"])
+            state["head"] = b""
+
+        parser = MultipartParser(boundary, {
+            "on_part_begin": on_part_begin,
+            "on_header_field": on_header_field,
+            "on_header_value": on_header_value,
+            "on_header_end": on_header_end,
+            "on_headers_finished": on_headers_finished,
+            "on_part_data": on_part_data,
+            "on_part_end": on_part_end,
+        })
+
+        try:
+            received = 0
+            async for chunk in request.stream():
+                received += len(chunk)
+                if received > self.max_file_size + MULTIPART_OVERHEAD:
+                    raise self._too_large()
+                parser.write(chunk)
+            parser.finalize()
+
+            if not state["found"]:
+                raise HTTPException(status_code=400, detail=f"Missing '{field_name}' upload")
+            if state["size"] == 0:
+                raise HTTPException(status_code=400, detail="Uploaded file is empty")
+
+            # Header was not in the sniffed bytes (TIFF, or JPEG with large metadata)
+            if state["width"] is None or state["height"] is None:
+                state["width"], state["height"] = self._read_dimensions(spool)
+                self._check_dimensions(state["width"], state["height"])
+        except BaseException:
+            spool.close()
+            raise
+
+        return ImageUpload(spool, state["size"], sha256.hexdigest(), state["format"],
+                           state["width"], state["height"])
+
+    def _too_large(self) -> HTTPException:
+        if self.max_file_size >= 1024 * 1024:
+            limit = f"{self.max_file_size // (1024 * 1024)}MB"
+        elif self.max_file_size >= 1024:
+            limit = f"{self.max_file_size // 1024}KB"
+        else:
+            limit = f"{self.max_file_size} bytes"
+        return HTTPException(status_code=413, detail=f"File too large. Maximum size is {limit}")
+
+    def _read_dimensions(self, spool) -> Tuple[int, int]:
+        """Read dimensions with PIL, which parses the header without decoding pixels."""
+        spool.seek(0)
+        try:
+            with Image.open(spool) as image:
+                return image.size
+        except Image.DecompressionBombError:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Image dimensions exceed the maximum of {self.max_image_pixels} pixels"
+            )
+        except Exception:
+            raise HTTPException(status_code=400, detail="Could not read image dimensions")
+
+    def _check_extension(self, filename: Optional[str]):
+        """Reject filenames whose extension is not in the allowed list."""
+        if not filename:
+            return
+        extension = os.path.splitext(filename)[1].lower()
+        if extension and extension not in self.allowed_extensions:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unsupported file type '{extension}'. Allowed: {', '.join(sorted(self.allowed_extensions))}"
+            )
+
+    def _sniff_format(self, head: bytes) -> str:
+        """Identify the image format from its magic bytes."""
+        for magic, image_format in MAGIC_NUMBERS:
+            if head.startswith(magic):
+                if not self.allowed_extensions.intersection(FORMAT_EXTENSIONS[image_format]):
+                    break
+                return image_format
+        raise HTTPException(status_code=400, detail="File content is not a supported image format")
+
+    def _sniff_dimensions(self, image_format: str, head: bytes) -> Tuple[Optional[int], Optional[int]]:
+        """Read width and height from the image header, if present in the first chunk."""
+        if image_format == "png" and len(head) >= 24:
+            return int.from_bytes(head[16:20], "big"), int.from_bytes(head[20:24], "big")
+        if image_format == "gif" and len(head) >= 10:
+            return int.from_bytes(head[6:8], "little"), int.from_bytes(head[8:10], "little")
+        if image_format == "bmp" and len(head) >= 26:
+            width = int.from_bytes(head[18:22], "little", signed=True)
+            height = int.from_bytes(head[22:26], "little", signed=True)
+            return abs(width), abs(height)
+        if image_format == "jpeg":
+            return self._sniff_jpeg_dimensions(head)
+        # TIFF stores dimensions in an IFD that may live anywhere in the file
+        return None, None
+
+    def _sniff_jpeg_dimensions(self, head: bytes) -> Tuple[Optional[int], Optional[int]]:
+        """Walk JPEG segments until a start-of-frame marker is found."""
+        i = 2
+        while i + 4 <= len(head):
+            if head[i] != 0xFF:
+                break
+            marker = head[i + 1]
+            if marker == 0xFF:
+                i += 1
+                continue
+            if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+                i += 2
+                continue
+            if marker in JPEG_SOF_MARKERS:
+                if i + 9 > len(head):
+                    break
+                height = int.from_bytes(head[i + 5:i + 7], "big")
+                width = int.from_bytes(head[i + 7:i + 9], "big")
+                return width, height
+            i += 2 + int.from_bytes(head[i + 2:i + 4], "big")
+        return None, None
+
+    def _check_dimensions(self, width: Optional[int], height: Optional[int]):
+        """Reject images whose declared dimensions are unusable or too large to decode."""
+        if width is None or height is None:
+            return
+        if width == 0 or height == 0:
+            raise HTTPException(status_code=400, detail="Image has invalid dimensions")
+        if width * height > self.max_image_pixels:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Image dimensions {width}x{height} exceed the maximum of {self.max_image_pixels} pixels"
+            )